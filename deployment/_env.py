@@ -0,0 +1,31 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Configuration loaded once from the .env file and the environment."""
+
+import functools
+import os
+
+from dotenv import dotenv_values
+
+
+@functools.lru_cache
+def cfg() -> dict[str, str | None]:
+    """Returns the environment, overridden by any values set in the .env file.
+
+    The .env file wins because importing the agent package sets defaults for
+    GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_LOCATION in os.environ.
+    """
+    env_file = {k: v for k, v in dotenv_values(".env").items() if v is not None}
+    return {**os.environ, **env_file}
@@ -0,0 +1,206 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers shared by the clients of the deployed Financial Advisor agent."""
+
+import asyncio
+import atexit
+import contextlib
+import functools
+import queue
+import socket
+import threading
+from collections.abc import AsyncIterator, Iterator
+from typing import Any
+
+import vertexai
+from google.auth.credentials import Credentials
+from google.auth.transport.requests import AuthorizedSession
+from google.cloud.aiplatform import initializer
+from requests import Response
+from requests.adapters import HTTPAdapter
+from vertexai import agent_engines
+
+from deployment._sse import parse_stream
+
+# Give up if connecting takes longer than this, but wait indefinitely between
+# events since the agent may think for a while before it answers.
+STREAM_TIMEOUT = (10, None)
+
+# Marks the end of the events pumped from the worker thread.
+_SENTINEL = object()
+
+# Marks the end of the items handed over by iterate_in_loop.
+_DONE = object()
+
+# The arguments vertexai.init ran with in this process, if it has run.
+_INIT_ARGS: tuple[str | None, str | None, Credentials | None] | None = None
+
+
+def init_vertexai(
+    project: str | None, location: str | None, credentials: Credentials | None = None
+) -> None:
+    """Initializes the Vertex AI SDK once per process.
+
+    Raises:
+        ValueError: If the SDK was already initialized with other arguments.
+    """
+    global _INIT_ARGS
+    init_args = (project, location, credentials)
+    if _INIT_ARGS is not None:
+        if init_args != _INIT_ARGS:
+            raise ValueError(
+                "Vertex AI is already initialized with a different project, "
+                "location or credentials."
+            )
+        return
+    vertexai.init(project=project, location=location, credentials=credentials)
+    _INIT_ARGS = init_args
+
+
+@functools.lru_cache(maxsize=8)
+def get_client(engine_name: str) -> agent_engines.AgentEngine:
+    """Returns the client for a deployed agent engine, fetching it only once.
+
+    Raises:
+        RuntimeError: If init_vertexai has not been called yet.
+    """
+    if _INIT_ARGS is None:
+        raise RuntimeError("Call init_vertexai before get_client.")
+    return agent_engines.get(engine_name)
+
+
+@functools.lru_cache(maxsize=1)
+def _authorized_session() -> AuthorizedSession:
+    """Returns a session shared by all REST calls so connections stay open."""
+    session = AuthorizedSession(initializer.global_config.credentials)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+    session.mount("https://", adapter)
+    atexit.register(session.close)
+    return session
+
+
+def open_stream_query_sse(agent: agent_engines.AgentEngine, **kwargs: Any) -> Response:
+    """Starts a streaming query that returns events as server-sent events.
+
+    Requesting `alt=sse` keeps proxies and load balancers from buffering the
+    response, so events arrive as they are produced rather than all at once.
+    Read the events with `parse_stream(response.iter_lines())`, and close the
+    response when done.
+    """
+    # Resource names look like projects/*/locations/*/reasoningEngines/*.
+    location = agent.resource_name.split("/")[3]
+    url = (
+        f"https://{location}-aiplatform.googleapis.com/v1/"
+        f"{agent.resource_name}:streamQuery?alt=sse"
+    )
+    response = _authorized_session().post(
+        url,
+        json={"class_method": "stream_query", "input": kwargs},
+        headers={"Accept": "text/event-stream"},
+        stream=True,
+        timeout=STREAM_TIMEOUT,
+    )
+    try:
+        response.raise_for_status()
+    except Exception:
+        response.close()
+        raise
+    return response
+
+
+def _abort(response: Response) -> None:
+    """Closes a streaming response, interrupting a read blocked on it.
+
+    Closing the response alone leaves a read on another thread waiting for the
+    next event, so shut the socket down first.
+    """
+    connection = response.raw.connection
+    if connection is not None and connection.sock is not None:
+        with contextlib.suppress(OSError):
+            connection.sock.shutdown(socket.SHUT_RDWR)
+    response.close()
+
+
+async def true_async_stream(
+    agent: agent_engines.AgentEngine, **kwargs: Any
+) -> AsyncIterator[Any]:
+    """Streams query events without blocking the event loop.
+
+    `async_stream_query` on a remote agent waits for the whole response on the
+    event loop thread, so iterate the blocking SSE stream on a worker thread
+    instead and hand each event back as it arrives.
+    """
+    loop = asyncio.get_running_loop()
+    event_queue: asyncio.Queue[Any] = asyncio.Queue()
+    stop = threading.Event()
+    responses: list[Response] = []
+
+    def pump() -> None:
+        try:
+            with open_stream_query_sse(agent, **kwargs) as response:
+                responses.append(response)
+                # The caller may have stopped while the request was starting.
+                if stop.is_set():
+                    return
+                for event in parse_stream(response.iter_lines()):
+                    loop.call_soon_threadsafe(event_queue.put_nowait, event)
+        except Exception:
+            # Closing the response under a blocked read makes the read fail.
+            if not stop.is_set():
+                raise
+        finally:
+            loop.call_soon_threadsafe(event_queue.put_nowait, _SENTINEL)
+
+    pump_future = loop.run_in_executor(None, pump)
+    try:
+        while (event := await event_queue.get()) is not _SENTINEL:
+            yield event
+    finally:
+        # If the caller stops iterating early, drop the connection to the
+        # agent rather than waiting for its next event.
+        stop.set()
+        for response in responses:
+            _abort(response)
+    # Surface any error raised while streaming.
+    await pump_future
+
+
+def iterate_in_loop(
+    async_iter: AsyncIterator[Any], loop: asyncio.AbstractEventLoop
+) -> Iterator[Any]:
+    """Drives an async iterator on `loop`, yielding its items on this thread.
+
+    Closing the returned generator early cancels the iteration on the loop.
+    """
+    items: queue.Queue = queue.Queue()
+
+    async def pump() -> None:
+        try:
+            async for item in async_iter:
+                items.put(item)
+        finally:
+            items.put(_DONE)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), loop)
+    try:
+        while (item := items.get()) is not _DONE:
+            yield item
+        # Surface any error raised while streaming.
+        future.result()
+    finally:
+        # Streamlit closes this generator when the script stops or reruns
+        # mid-stream; stop pumping items nobody will read. This does nothing
+        # once the pump has finished.
+        future.cancel()
@@ -0,0 +1,51 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Local bookkeeping for the agent sessions shown in the Streamlit app."""
+
+import time
+
+# Event parts that carry raw media rather than anything worth showing.
+MEDIA_PART_KEYS = ("inline_data", "file_data")
+
+
+def strip_media(event: dict) -> dict:
+    """Returns the event without media parts, keeping text, tool calls and the rest."""
+    content = event.get("content")
+    parts = content.get("parts") if content else None
+    if not parts:
+        return event
+    kept = [p for p in parts if not any(key in p for key in MEDIA_PART_KEYS)]
+    if len(kept) == len(parts):
+        return event
+    return {**event, "content": {**content, "parts": kept}}
+
+
+def merge_events(session: dict, events: list[dict]) -> dict:
+    """Returns the session with the turn's events and state deltas applied locally.
+
+    This mirrors what the session service stores for the turn, saving a
+    round-trip to fetch the session after every response.
+    """
+    state = dict(session.get("state") or {})
+    for event in events:
+        state_delta = (event.get("actions") or {}).get("state_delta") or {}
+        # temp: keys are never persisted by the session service.
+        state.update((k, v) for k, v in state_delta.items() if not k.startswith("temp:"))
+    return {
+        **session,
+        "events": [*session.get("events", []), *(strip_media(e) for e in events)],
+        "state": state,
+        "last_update_time": time.time(),
+    }
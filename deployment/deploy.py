@@ -21,12 +21,25 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import vertexai
-from dotenv import load_dotenv, dotenv_values
 from agent.agent import root_agent
+from deployment._env import cfg
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
 
+REQUIREMENTS_FILE = os.path.join(os.path.dirname(__file__), "requirements.txt")
+
+
+def load_requirements() -> list[str]:
+    """Reads the pinned requirements for the deployed agent."""
+    with open(REQUIREMENTS_FILE) as f:
+        return [
+            line.strip()
+            for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
 def create(location: str) -> None:
     """Creates an agent engine for Financial Advisors with telemetry enabled."""
     # AdkApp wraps our agent logic for deployment.
@@ -43,13 +56,7 @@ def create(location: str) -> None:
         agent_engine=adk_app,
         display_name=root_agent.name,
         extra_packages=["agent/sub_agents"],
-        requirements=[
-            "google-adk (>=0.0.2)",
-            "google-cloud-aiplatform[agent_engines] (>=1.91.0,!=1.92.0)",
-            "google-genai (>=1.5.0,<2.0.0)",
-            "pydantic (>=2.10.6,<3.0.0)",
-            "absl-py (>=2.2.1,<3.0.0)",
-        ],
+        requirements=load_requirements(),
         # Enable tracing and telemetry via environment variables
         env_vars={
             "GOOGLE_CLOUD_AGENT_ENGINE_ENABLE_TELEMETRY": "true",
@@ -88,7 +95,7 @@ def main() -> None:
     # location = os.getenv("GOOGLE_CLOUD_LOCATION")
     # bucket = os.getenv("GOOGLE_CLOUD_STORAGE_BUCKET")
 
-    config = dotenv_values(".env")
+    config = cfg()
     
     project_id = config.get("GOOGLE_CLOUD_PROJECT")
     location = config.get("GOOGLE_CLOUD_LOCATION")
@@ -2,46 +2,65 @@
 Simple script to use the deployed Financial Advisor Agent with streaming and session support.
 """
 
+import argparse
 import sys
 import os
 import asyncio
 import uuid
-import vertexai
-from dotenv import load_dotenv, dotenv_values
-from vertexai import agent_engines
+
+# Add project root to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from deployment._env import cfg
 
 async def main():
     # 0. Load environment variables
-    config = dotenv_values(".env")
+    config = cfg()
     
     project_id = config.get("GOOGLE_CLOUD_PROJECT")
     location = config.get("GOOGLE_CLOUD_LOCATION")
     bucket = config.get("GOOGLE_CLOUD_STORAGE_BUCKET")
 
     # 1. Parse Agent Engine Resource ID
-    if len(sys.argv) < 2:
-        print('Usage: python use_agent.py <AGENT_ENGINE_RESOURCE_ID>')
-        print('Example: python use_agent.py projects/my-project/locations/us-central1/reasoningEngines/123456')
-        sys.exit(1)
-
-    engine_name = sys.argv[1]
+    parser = argparse.ArgumentParser(
+        description="Query the deployed Financial Advisor agent.",
+        epilog="Example: python %(prog)s projects/my-project/locations/us-central1/reasoningEngines/123456",
+    )
+    parser.add_argument(
+        "engine_name",
+        metavar="AGENT_ENGINE_RESOURCE_ID",
+        help="Agent engine resource name, or just its numeric ID.",
+    )
+    engine_name = parser.parse_args().engine_name
     
     # Format the engine name if only the numeric ID was provided
     if not engine_name.startswith("projects/"):
-        if not project_id:
-            print("Error: GOOGLE_CLOUD_PROJECT environment variable is required if only the ID is provided.")
-            sys.exit(1)
+        if not project_id or not location:
+            parser.error(
+                "GOOGLE_CLOUD_PROJECT and GOOGLE_CLOUD_LOCATION environment "
+                "variables are required if only the ID is provided."
+            )
         engine_name = f"projects/{project_id}/locations/{location}/reasoningEngines/{engine_name}"
 
+    # Import the SDKs only once the arguments are known to be valid.
+    import google.auth
+    import google.auth.transport.requests
+    from deployment._remote import get_client, init_vertexai, true_async_stream
+
     print(f"Connecting to Agent Engine: {engine_name}")
     print(f"Project: {project_id}, Location: {location}")
     
     # 2. Initialize Vertex AI
-    vertexai.init(project=project_id, location=location)
+    # Fetch the access token up front so the first query doesn't wait on it.
+    creds, _ = google.auth.default(
+        scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+    creds.refresh(google.auth.transport.requests.Request())
+    init_vertexai(project_id, location, credentials=creds)
 
     # 3. Get the Remote Agent
     try:
-        remote_agent = agent_engines.get(engine_name)
+        remote_agent = get_client(engine_name)
         print(f"Successfully connected to: {remote_agent.resource_name}")
     except Exception as e:
         print(f"Error connecting to agent: {e}")
@@ -49,7 +68,7 @@ async def main():
 
     # 4. Create a Session
     # Use USER_ID from environment if available, otherwise generate a demo one.
-    user_id = os.getenv("USER_ID") or ("demo_user_" + str(uuid.uuid4())[:4])
+    user_id = config.get("USER_ID") or ("demo_user_" + str(uuid.uuid4())[:4])
     try:
         session = remote_agent.create_session(user_id=user_id)
         session_id = session["id"]
@@ -64,21 +83,30 @@ async def main():
     print(f"\n--- User Query ---\n{user_query}")
     print("\n--- Agent Response (Streaming...) ---\n")
     
+    write = sys.stdout.write
+    flush = sys.stdout.flush
     try:
-        # Use async_stream_query with session support
-        async for event in remote_agent.async_stream_query(
+        # Stream with session support without blocking the event loop
+        async for event in true_async_stream(
+            remote_agent,
             user_id=user_id,
             session_id=session_id,
             message=user_query
         ):
+            if isinstance(event, str):
+                write(event)
+                flush()
+                continue
             # Extract text from translation/content events
-            if "content" in event and "parts" in event["content"]:
-                for part in event["content"]["parts"]:
-                    if "text" in part:
-                        print(part["text"], end="", flush=True)
-            elif isinstance(event, str):
-                print(event, end="", flush=True)
-                
+            content = event.get("content")
+            parts = content.get("parts") if content else None
+            if parts:
+                for part in parts:
+                    text = part.get("text")
+                    if text:
+                        write(text)
+                flush()
+
         print("\n\n--- Stream Completed ---")
     except Exception as e:
         print(f"\nError during streaming query: {e}")
@@ -21,8 +21,9 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import vertexai
-from dotenv import dotenv_values
 from agent.agent import root_agent
+from deployment._env import cfg
+from deployment.deploy import load_requirements
 from vertexai import agent_engines
 from vertexai.preview.reasoning_engines import AdkApp
 
@@ -42,13 +43,14 @@ def update(engine_name: str) -> None:
     remote_agent = agent_engines.update(
         resource_name=engine_name,
         agent_engine=adk_app,
+        requirements=load_requirements(),
     )
     print(f"Successfully updated remote agent: {remote_agent.resource_name}")
 
 
 def main() -> None:
     """Main update flow."""
-    config = dotenv_values(".env")
+    config = cfg()
 
     project_id = config.get("GOOGLE_CLOUD_PROJECT")
     location = config.get("GOOGLE_CLOUD_LOCATION")
@@ -15,18 +15,26 @@
 """Streamlit web app for interacting with the Financial Advisor Agent."""
 
 import asyncio
+import concurrent.futures
+import datetime
 import os
+import threading
+import time
 import uuid
-import vertexai
+from collections.abc import AsyncIterator
+import google.auth
+import google.auth.transport.requests
 import streamlit as st # type: ignore
-from dotenv import load_dotenv, dotenv_values
 from vertexai import agent_engines
+from deployment import _remote
+from deployment._env import cfg
+from deployment._session import merge_events, strip_media
 
 
 # --- Configuration ---
 
-# Load environment variables from .env file
-config = dotenv_values(".env")
+# Load configuration from the .env file and the environment
+config = cfg()
 
 PROJECT_ID = config.get("GOOGLE_CLOUD_PROJECT")
 LOCATION = config.get("GOOGLE_CLOUD_LOCATION")
@@ -46,11 +54,45 @@ st.set_page_config(
 
 # --- Initialization ---
 
+# Refresh the access token this long before it expires.
+TOKEN_REFRESH_MARGIN = datetime.timedelta(minutes=5)
+
+def _refresh_credentials_forever(creds: google.auth.credentials.Credentials) -> None:
+    """Keep the credentials' access token fresh so queries never block on it."""
+    request = google.auth.transport.requests.Request()
+    while True:
+        if creds.expiry:
+            # google-auth stores expiry as a naive UTC datetime.
+            now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+            delay = (creds.expiry - now - TOKEN_REFRESH_MARGIN).total_seconds()
+        else:
+            delay = TOKEN_REFRESH_MARGIN.total_seconds()
+        time.sleep(max(delay, 30))
+        try:
+            creds.refresh(request)
+            print("Access token refreshed.")
+        except Exception as e:
+            print(f"Error refreshing access token: {e}")
+
+@st.cache_resource
+def init_credentials() -> google.auth.credentials.Credentials:
+    """Fetch Application Default Credentials and refresh them in the background."""
+    print("Fetching credentials...")
+    creds, _ = google.auth.default(
+        scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+    creds.refresh(google.auth.transport.requests.Request())
+    threading.Thread(
+        target=_refresh_credentials_forever, args=(creds,), daemon=True
+    ).start()
+    print("Credentials fetched.")
+    return creds
+
 @st.cache_resource
 def init_vertexai():
     """Initialize the Vertex AI SDK."""
     print("Initializing Vertex AI...")
-    vertexai.init(project=PROJECT_ID, location=LOCATION)
+    _remote.init_vertexai(PROJECT_ID, LOCATION, credentials=init_credentials())
     print("Vertex AI Initialized.")
 
 @st.cache_resource
@@ -65,33 +107,113 @@ def init_agent_engine() -> agent_engines.AgentEngine:
         )
         st.stop()
     print(f"Getting agent engine: {AGENT_ENGINE_NAME}")
-    agent = agent_engines.get(AGENT_ENGINE_NAME)
+    agent = _remote.get_client(AGENT_ENGINE_NAME)
     print("AgentEngine Initialized.")
     return agent
 
+@st.cache_resource
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return a persistent event loop running on a background thread.
+
+    Reusing one loop across reruns keeps the client's connections to Vertex AI
+    warm instead of tearing them down after every prompt. Every browser session
+    shares this loop, so coroutines run on it must never call Streamlit; they
+    hand their results back to the script thread instead.
+    """
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
 init_vertexai()
 agent = init_agent_engine()
 
+def fetch_session(session_id: str) -> dict:
+    """Fetches the stored session from the agent engine, without media parts."""
+    print("Getting updated session...")
+    session = asyncio.run_coroutine_threadsafe(
+        agent.async_get_session(session_id=session_id, user_id=st.session_state.user_id),
+        get_loop(),
+    ).result()
+    # Drop media blobs so they aren't kept in memory or sent to the browser.
+    session["events"] = [strip_media(e) for e in session.get("events", [])]
+    print("Session retrieved.")
+    return session
+
+async def stream_response(
+    prompt: str, session_id: str, user_id: str, events: list[dict]
+) -> AsyncIterator[str]:
+    """Yields the text of the agent's response, collecting each event into `events`."""
+    response_stream = _remote.true_async_stream(
+        agent, message=prompt, user_id=user_id, session_id=session_id
+    )
+    print("--- Agent Chunks ---")
+    async for chunk in response_stream:
+        print(chunk)
+        # Handle simple string chunks
+        if isinstance(chunk, str):
+            yield chunk
+            continue
+        events.append(chunk)
+        # Handle dictionary chunks with content
+        content = chunk.get("content")
+        parts = content.get("parts") if content else None
+        if parts:
+            for part in parts:
+                text = part.get("text")
+                if text:
+                    yield text
+    print("--- End of Agent Chunks ---")
+
+def request_session() -> concurrent.futures.Future:
+    """Starts creating a session in the background."""
+    print("Requesting a new session...")
+    return asyncio.run_coroutine_threadsafe(
+        agent.async_create_session(user_id=st.session_state.user_id), get_loop()
+    )
+
+def use_pending_session():
+    """Makes the session being created in the background the active one, waiting for it if needed."""
+    pending = st.session_state.pop("pending_session_future", None)
+    try:
+        new_session_obj = pending.result() if pending else None
+    except Exception as e:
+        print(f"Error creating session in the background: {e}")
+        new_session_obj = None
+    if new_session_obj is None:
+        new_session_obj = agent.create_session(user_id=st.session_state.user_id)
+    st.session_state.session_id = new_session_obj["id"]
+    st.session_state.sessions_by_id[new_session_obj["id"]] = new_session_obj
+    st.session_state.messages[st.session_state.session_id] = []
+    print(f"New session created: {st.session_state.session_id}")
+
 def create_new_session():
     """Creates a new session and updates the session state."""
     print("Creating a new session...")
     st.info("Creating a new session...")
-    new_session_obj = agent.create_session(user_id=st.session_state.user_id)
-    st.session_state.session_id = new_session_obj["id"]
-    st.session_state.sessions.append(new_session_obj)
-    st.session_state.messages[st.session_state.session_id] = []
-    print(f"New session created: {st.session_state.session_id}")
+    use_pending_session()
+    # Someone who starts a second chat is likely to start more, so keep a
+    # spare ready for the next "New Chat".
+    st.session_state.pending_session_future = request_session()
+
 # --- Session State Management ---
 
 if "session_id" not in st.session_state:
     st.session_state.session_id = None
-if "sessions" not in st.session_state:
-    st.session_state.sessions = []
+if "sessions_by_id" not in st.session_state:
+    st.session_state.sessions_by_id = {}
 if "messages" not in st.session_state:
     st.session_state.messages = {}
 if "user_id" not in st.session_state:
     st.session_state.user_id = f"streamlit-user-{uuid.uuid4()}"
 
+# Create the first session in the background so the page renders without
+# waiting for it, and adopt it once it's ready.
+if not st.session_state.session_id:
+    if "pending_session_future" not in st.session_state:
+        st.session_state.pending_session_future = request_session()
+    elif st.session_state.pending_session_future.done():
+        use_pending_session()
+
 # --- Sidebar for Session Control ---
 
 with st.sidebar:
@@ -103,9 +225,9 @@ with st.sidebar:
         st.rerun()
 
     # Dropdown to select a session
-    if st.session_state.sessions:
+    if st.session_state.sessions_by_id:
         # Create a list of session IDs for the dropdown
-        session_options = [s["id"] for s in st.session_state.sessions]
+        session_options = list(st.session_state.sessions_by_id)
         # If there's an active session, find its index
         try:
             current_session_index = session_options.index(st.session_state.session_id)
@@ -132,91 +254,71 @@ st.write(
     "Welcome! I can help you analyze market tickers, develop trading strategies, and more."
 )
 
-# Create a new session
-if not st.session_state.session_id:
-    create_new_session()
-    st.rerun()
-
 chat_tab, state_tab = st.tabs(["Chat", "Session State"])
 
+with chat_tab:
+    # Display chat messages for the active session
+    if st.session_state.session_id:
+        for message in st.session_state.messages.get(st.session_state.session_id, []):
+            with st.chat_message(message["role"]):
+                st.markdown(message["content"])
+
 # Handle user input at the bottom of the page
 if prompt := st.chat_input("What would you like to analyze?"):
     print("\n--- New User Input ---")
+    # Wait for the first session if it isn't ready yet
+    if not st.session_state.session_id:
+        use_pending_session()
     # Display user message and add to history
-    with st.chat_message("user"):
+    with chat_tab, st.chat_message("user"):
         st.markdown(prompt)
     st.session_state.messages.setdefault(st.session_state.session_id, []).append(
         {"role": "user", "content": prompt}
     )
 
     # Stream agent response
-    with st.chat_message("assistant"):
-        message_placeholder = st.empty()
-
-        # Use an async function to handle the streaming call
-        async def get_response_and_session(prompt: str) -> tuple[str, dict]:
-            """Streams the agent's response and returns the full content and updated session."""
-            full_response_content = ""
-            print("Streaming agent response...")
-            response_stream = agent.async_stream_query(
-                message=prompt,
-                user_id=st.session_state.user_id,
-                session_id=st.session_state.session_id,
+    prior_session = st.session_state.sessions_by_id.get(st.session_state.session_id, {})
+    # The user's message is stored as the first event of the turn.
+    new_events: list[dict] = [{
+        "author": "user",
+        "content": {"role": "user", "parts": [{"text": prompt}]},
+        "timestamp": time.time(),
+    }]
+    with chat_tab, st.chat_message("assistant"):
+        print("Streaming agent response...")
+        full_response = st.write_stream(
+            _remote.iterate_in_loop(
+                stream_response(
+                    prompt,
+                    session_id=st.session_state.session_id,
+                    user_id=st.session_state.user_id,
+                    events=new_events,
+                ),
+                get_loop(),
             )
-            print("--- Agent Chunks ---")
-            async for chunk in response_stream:
-                print(chunk)
-                # Handle dictionary chunks with content
-                if isinstance(chunk, dict) and "content" in chunk and "parts" in chunk["content"]:
-                    for part in chunk["content"]["parts"]:
-                        if "text" in part:
-                            full_response_content += part["text"]
-                            message_placeholder.markdown(full_response_content + "▌")
-                # Handle simple string chunks
-                elif isinstance(chunk, str):
-                    full_response_content += chunk
-                    message_placeholder.markdown(full_response_content + "▌")
-            message_placeholder.markdown(full_response_content)
-            print("--- End of Agent Chunks ---")
-            print("Stream complete.")
-
-            print("Getting updated session...")
-            updated_session = await agent.async_get_session(
-                session_id=st.session_state.session_id, user_id=st.session_state.user_id
-            )
-            print("Session retrieved.")
-            return full_response_content, updated_session
-
-        print("Running get_response_and_session...")
-        full_response, updated_session_obj = asyncio.run(get_response_and_session(prompt))
-        print("get_response_and_session finished.")
+        )
+        print("Stream complete.")
+    updated_session_obj = merge_events(prior_session, new_events)
 
     # Add agent response to history
     st.session_state.messages[st.session_state.session_id].append(
         {"role": "assistant", "content": full_response}
     )
 
-    # Update the session object in the list
-    for i, s in enumerate(st.session_state.sessions):
-        if s["id"] == st.session_state.session_id:
-            st.session_state.sessions[i] = updated_session_obj
-            break
-
-    # Rerun to display the new agent message
-    st.rerun()
-
-with chat_tab:
-    # Display chat messages for the active session
-    if st.session_state.session_id:
-        for message in st.session_state.messages.get(st.session_state.session_id, []):
-            with st.chat_message(message["role"]):
-                st.markdown(message["content"])
+    # Update the session object
+    st.session_state.sessions_by_id[st.session_state.session_id] = updated_session_obj
+    # The new messages are already on the page, so there's no need to rerun.
 
 with state_tab:
     st.header("Current ADK Session State")
     if st.session_state.session_id:
+        # Turns update the session locally; fetch the stored copy on request.
+        if st.button("Refresh state"):
+            st.session_state.sessions_by_id[st.session_state.session_id] = fetch_session(
+                st.session_state.session_id
+            )
         # Find the current session object
-        current_session_obj = next((s for s in st.session_state.sessions if s["id"] == st.session_state.session_id), None)
+        current_session_obj = st.session_state.sessions_by_id.get(st.session_state.session_id)
         if current_session_obj:
             st.json(current_session_obj)
         else:
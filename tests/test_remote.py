@@ -0,0 +1,129 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the streaming helpers shared by the agent's clients"""
+
+import asyncio
+import socket
+import threading
+import time
+from collections.abc import AsyncIterator, Iterator
+
+import pytest
+import requests
+
+from deployment import _remote
+from deployment._remote import iterate_in_loop, true_async_stream
+
+
+@pytest.fixture
+def loop() -> Iterator[asyncio.AbstractEventLoop]:
+    """Runs an event loop on a background thread, as the Streamlit app does."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+async def count(n: int) -> AsyncIterator[int]:
+    """Yields 0 to n - 1, one per pass of the event loop."""
+    for i in range(n):
+        await asyncio.sleep(0)
+        yield i
+    # Hold up the loop while the consumer sees the end of the items, before
+    # the pump's future is marked done.
+    asyncio.get_running_loop().call_soon(time.sleep, 0.2)
+
+
+def test_iterate_in_loop(loop: asyncio.AbstractEventLoop):
+    """Test that every item is handed over once the iterator finishes."""
+    assert list(iterate_in_loop(count(3), loop)) == [0, 1, 2]
+
+
+def test_iterate_in_loop_raises(loop: asyncio.AbstractEventLoop):
+    """Test that an error raised on the loop reaches the consumer."""
+
+    async def fail() -> AsyncIterator[int]:
+        yield 0
+        raise ValueError("stream failed")
+
+    items = []
+    with pytest.raises(ValueError, match="stream failed"):
+        for item in iterate_in_loop(fail(), loop):
+            items.append(item)
+    assert items == [0]
+
+
+def test_iterate_in_loop_close(loop: asyncio.AbstractEventLoop):
+    """Test that closing the generator early stops the iterator on the loop."""
+    closed = threading.Event()
+
+    async def endless() -> AsyncIterator[int]:
+        try:
+            yield 0
+            await asyncio.Event().wait()
+        finally:
+            closed.set()
+
+    items = iterate_in_loop(endless(), loop)
+    assert next(items) == 0
+    items.close()
+    assert closed.wait(timeout=5)
+
+
+def test_true_async_stream_close(monkeypatch: pytest.MonkeyPatch):
+    """Test that closing the stream early stops the worker without waiting."""
+    server = socket.create_server(("127.0.0.1", 0))
+
+    def serve() -> None:
+        """Sends one event, then stays silent for longer than the test waits."""
+        conn, _ = server.accept()
+        with conn:
+            conn.recv(65536)
+            body = b'data: {"content": {"parts": [{"text": "Hello"}]}}\n\n'
+            conn.sendall(
+                b"HTTP/1.1 200 OK\r\n"
+                b"Content-Type: text/event-stream\r\n"
+                b"Transfer-Encoding: chunked\r\n\r\n"
+                b"%x\r\n%s\r\n" % (len(body), body)
+            )
+            time.sleep(5)
+
+    threading.Thread(target=serve, daemon=True).start()
+    url = f"http://127.0.0.1:{server.getsockname()[1]}/"
+    monkeypatch.setattr(
+        _remote,
+        "open_stream_query_sse",
+        lambda agent, **kwargs: requests.post(
+            url, stream=True, timeout=_remote.STREAM_TIMEOUT
+        ),
+    )
+
+    async def first_event() -> dict:
+        stream = true_async_stream(None)
+        event = await stream.__anext__()
+        # Let the worker block reading the next event.
+        await asyncio.sleep(0.2)
+        await stream.aclose()
+        return event
+
+    with server:
+        start = time.monotonic()
+        # asyncio.run waits for the worker thread before it returns.
+        event = asyncio.run(first_event())
+        assert time.monotonic() - start < 2
+    assert event == {"content": {"parts": [{"text": "Hello"}]}}
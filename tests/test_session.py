@@ -0,0 +1,77 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the local session bookkeeping of the Streamlit app"""
+
+from deployment._session import merge_events, strip_media
+
+TEXT = {"text": "Here is the chart."}
+CALL = {"function_call": {"name": "get_quote", "args": {"ticker": "AAPL"}}}
+IMAGE = {"inline_data": {"mime_type": "image/png", "data": "iVBORw0KGgo="}}
+FILE = {"file_data": {"mime_type": "application/pdf", "file_uri": "gs://b/r.pdf"}}
+
+
+def event(*parts: dict, **fields) -> dict:
+    """Builds an agent event with the given content parts."""
+    return {"author": "financial_coordinator", "content": {"parts": list(parts)}, **fields}
+
+
+def test_strip_media():
+    """Test that media parts are dropped and everything else is kept."""
+    stripped = strip_media(event(TEXT, IMAGE, CALL, FILE, id="e1"))
+    assert stripped == event(TEXT, CALL, id="e1")
+
+
+def test_strip_media_unchanged():
+    """Test that events without media are returned as they are."""
+    for unchanged in (event(TEXT, CALL), event(), {"author": "user"}):
+        assert strip_media(unchanged) is unchanged
+
+
+def test_merge_events():
+    """Test that the turn's events are appended and their state deltas applied."""
+    session = {
+        "id": "s1",
+        "events": [event(TEXT)],
+        "state": {"ticker": "GOOG", "risk": "low"},
+        "last_update_time": 0,
+    }
+    new_events = [
+        event(CALL, actions={"state_delta": {"ticker": "AAPL", "temp:scratch": 1}}),
+        event(TEXT, IMAGE, actions={"state_delta": {"report": "done"}}),
+        event(TEXT),
+    ]
+
+    merged = merge_events(session, new_events)
+
+    assert merged["id"] == "s1"
+    assert merged["events"] == [
+        event(TEXT),
+        new_events[0],
+        event(TEXT, actions={"state_delta": {"report": "done"}}),
+        event(TEXT),
+    ]
+    # temp: keys are not persisted, so they never reach the session state.
+    assert merged["state"] == {"ticker": "AAPL", "risk": "low", "report": "done"}
+    assert merged["last_update_time"] > 0
+    # The cached session is left as it was.
+    assert session["state"] == {"ticker": "GOOG", "risk": "low"}
+    assert len(session["events"]) == 1
+
+
+def test_merge_events_empty_session():
+    """Test merging into a session that has no events or state yet."""
+    merged = merge_events({}, [event(TEXT, actions={"state_delta": {"k": "v"}})])
+    assert merged["events"] == [event(TEXT, actions={"state_delta": {"k": "v"}})]
+    assert merged["state"] == {"k": "v"}
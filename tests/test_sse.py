@@ -0,0 +1,70 @@
+# Copyright 2025 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Tests for the `:streamQuery?alt=sse` parser"""
+
+import importlib
+import json
+import pathlib
+import sys
+
+import pytest
+
+from deployment import _sse
+from deployment._sse import parse_stream
+
+DATA_DIR = pathlib.Path(__file__).parent / "data"
+
+HELLO = {
+    "author": "financial_coordinator",
+    "content": {"role": "model", "parts": [{"text": "Hello"}]},
+}
+WORLD = {
+    "author": "financial_coordinator",
+    "content": {"role": "model", "parts": [{"text": " world"}]},
+    "actions": {"state_delta": {"k": "v"}},
+}
+
+
+def read_lines(name: str) -> list[bytes]:
+    """Splits a fixture into lines the way requests' iter_lines does."""
+    return (DATA_DIR / name).read_bytes().splitlines()
+
+
+@pytest.mark.parametrize(
+    ("fixture", "expected"),
+    [
+        # Bare events, with comments, other fields and a multi-line data field.
+        ("stream_query_events.sse", [HELLO, WORLD]),
+        # HttpBody envelopes, and a last event with no closing blank line.
+        ("stream_query_http_body.sse", [HELLO, WORLD, HELLO]),
+    ],
+)
+def test_parse_stream(fixture: str, expected: list[dict]):
+    """Test that every agent event in the stream is decoded, and nothing else."""
+    assert list(parse_stream(read_lines(fixture))) == expected
+
+
+def test_parse_stream_without_orjson(monkeypatch: pytest.MonkeyPatch):
+    """Test that the parser falls back to json.loads when orjson is missing."""
+    # A None entry in sys.modules makes `import orjson` raise ImportError.
+    monkeypatch.setitem(sys.modules, "orjson", None)
+    try:
+        fallback = importlib.reload(_sse)
+        assert fallback.json_loads is json.loads
+        events = list(fallback.parse_stream(read_lines("stream_query_events.sse")))
+        assert events == [HELLO, WORLD]
+    finally:
+        monkeypatch.undo()
+        importlib.reload(_sse)